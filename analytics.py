@@ -0,0 +1,155 @@
+# analytics.py
+"""
+Инкрементальная аналитика продаж и автовыдачи.
+
+Заказы раскладываются по часовым корзинам за последние window_hours часов.
+Итоги скользящего окна (выручка по лотам и подкатегориям, успешные/неудачные
+выдачи) обновляются при добавлении заказа и при вытеснении старой корзины —
+история не пересчитывается. Время до выдачи хранится парами (когда, сколько)
+в том же окне и не более ttd_samples штук, так что память ограничена.
+"""
+from __future__ import annotations
+import math, threading, time
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional
+
+
+class _HourBucket:
+    def __init__(self, hour: int):
+        self.hour = hour
+        self.orders = 0
+        self.revenue = 0.0
+        self.delivered = 0
+        self.failed = 0
+        self.by_lot: Dict[str, float] = {}
+        self.by_subcategory: Dict[str, float] = {}
+
+
+def _add(totals: Dict[str, float], key: str, value: float):
+    totals[key] = totals.get(key, 0.0) + value
+    if abs(totals[key]) < 1e-9:
+        del totals[key]
+
+
+def percentile(sorted_values: List[float], p: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    # nearest-rank
+    k = max(0, min(len(sorted_values) - 1, math.ceil(p / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+class SalesAnalytics:
+    def __init__(self, window_hours: int = 24, ttd_samples: int = 1000, clock=time.time):
+        self.window_hours = window_hours
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._buckets: deque = deque()
+        self._ttd: deque = deque(maxlen=ttd_samples)  # (когда выдали, секунд до выдачи)
+        self._pending: OrderedDict = OrderedDict()  # order_id -> когда увидели заказ
+        self._lot_titles: Dict[str, str] = {}
+        self.revenue_by_lot: Dict[str, float] = {}
+        self.revenue_by_subcategory: Dict[str, float] = {}
+        self.orders = 0
+        self.revenue = 0.0
+        self.delivered = 0
+        self.failed = 0
+
+    def set_lots(self, lots):
+        """Лоты из get_active_lots: по названию заказа находим lot_id."""
+        with self._lock:
+            self._lot_titles = {l.title: str(l.lot_id) for l in lots if l.title}
+
+    # ---------- окно ----------
+    def _evict(self, oldest_hour: int):
+        while self._ttd and self._ttd[0][0] < oldest_hour * 3600:
+            self._ttd.popleft()
+        while self._buckets and self._buckets[0].hour < oldest_hour:
+            b = self._buckets.popleft()
+            self.orders -= b.orders
+            self.revenue -= b.revenue
+            self.delivered -= b.delivered
+            self.failed -= b.failed
+            for k, v in b.by_lot.items():
+                _add(self.revenue_by_lot, k, -v)
+            for k, v in b.by_subcategory.items():
+                _add(self.revenue_by_subcategory, k, -v)
+
+    def _bucket(self, ts: float) -> _HourBucket:
+        hour = int(ts // 3600)
+        self._evict(hour - self.window_hours + 1)
+        if not self._buckets or self._buckets[-1].hour < hour:
+            self._buckets.append(_HourBucket(hour))
+        return self._buckets[-1]
+
+    # ---------- события ----------
+    @staticmethod
+    def _order_ts(order) -> Optional[float]:
+        date = getattr(order, "date", None)
+        try:
+            return date.timestamp() if date is not None else None
+        except Exception:
+            return None
+
+    def record_order(self, order):
+        """Новый заказ (до фильтра автовыдачи): выручка и заказы в час."""
+        now = self.clock()
+        title = getattr(order, "short_description", getattr(order, "description", "")) or ""
+        subc = getattr(order, "subcategory_name", getattr(getattr(order, "subcategory", None), "name", "")) or "—"
+        try:
+            price = float(getattr(order, "price", 0.0) or 0.0)
+        except (TypeError, ValueError):
+            price = 0.0
+        with self._lock:
+            lot_key = self._lot_titles.get(title, title or "—")
+            b = self._bucket(now)
+            b.orders += 1
+            b.revenue += price
+            b.by_lot[lot_key] = b.by_lot.get(lot_key, 0.0) + price
+            b.by_subcategory[subc] = b.by_subcategory.get(subc, 0.0) + price
+            self.orders += 1
+            self.revenue += price
+            _add(self.revenue_by_lot, lot_key, price)
+            _add(self.revenue_by_subcategory, subc, price)
+            order_id = getattr(order, "id", None)
+            if order_id is not None:
+                self._pending[order_id] = self._order_ts(order) or now
+                while len(self._pending) > 1000:
+                    self._pending.popitem(last=False)
+
+    def record_delivery(self, order, ok: bool):
+        now = self.clock()
+        with self._lock:
+            b = self._bucket(now)
+            if ok:
+                b.delivered += 1
+                self.delivered += 1
+            else:
+                b.failed += 1
+                self.failed += 1
+            placed = self._pending.pop(getattr(order, "id", None), None) or self._order_ts(order)
+            if ok and placed is not None:
+                self._ttd.append((now, max(0.0, now - placed)))
+
+    # ---------- чтение ----------
+    def snapshot(self) -> dict:
+        with self._lock:
+            self._evict(int(self.clock() // 3600) - self.window_hours + 1)
+            current = int(self.clock() // 3600)
+            per_hour = {b.hour: b.orders for b in self._buckets}
+            ttd = sorted(d for _, d in self._ttd)
+            attempts = self.delivered + self.failed
+            return {
+                "orders": self.orders,
+                "revenue": round(self.revenue, 2),
+                "orders_per_hour": [(h * 3600, per_hour.get(h, 0))
+                                    for h in range(current - self.window_hours + 1, current + 1)],
+                "revenue_by_lot": dict(self.revenue_by_lot),
+                "revenue_by_subcategory": dict(self.revenue_by_subcategory),
+                "delivery_success_rate": (self.delivered / attempts) if attempts else None,
+                "delivered": self.delivered,
+                "failed": self.failed,
+                "ttd_p50": percentile(ttd, 50),
+                "ttd_p90": percentile(ttd, 90),
+                "ttd_p99": percentile(ttd, 99),
+            }
@@ -0,0 +1,313 @@
+# config_store.py
+"""
+Единое хранилище настроек: один файл config.json вместо россыпи .txt.
+Читается один раз в память, пишется атомарно, секреты (токены, пароль)
+шифруются, если установлен `cryptography`. Изменения файла извне
+подхватываются фоновым потоком и рассылаются подписчикам.
+"""
+from __future__ import annotations
+import os, json, threading, tempfile
+from typing import Callable, Dict, List
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except Exception:
+    Fernet = InvalidToken = None
+
+CONFIG_PATH = "config.json"
+KEY_PATH = "config.key"
+KEY_ENV = "FUNPAY_HELPER_KEY"
+ENC_PREFIX = "enc:"
+
+# ключ -> (тип, значение по умолчанию, секрет, старый .txt файл)
+FIELDS = {
+    "golden_key":      (str, "", True, "goldenkey.txt"),
+    "first_message":   (str, "", False, "message.txt"),
+    "account_name":    (str, "", False, "accountname.txt"),
+    "mail":            (str, "", False, "account1mail.txt"),
+    "password":        (str, "", True, "account1pass.txt"),
+    "discord_webhook": (str, "", True, "discord_webhook.txt"),
+    "tg_bot_token":    (str, "", True, "telegram_token.txt"),
+    "tg_chat_id":      (str, "", False, "telegram_chat_id.txt"),
+    "encrypt_secrets": (bool, True, False, None),
+}
+
+
+class ConfigStore:
+    def __init__(self, log, path: str = CONFIG_PATH, key_path: str = KEY_PATH):
+        self.log = log
+        self.path = path
+        self.key_path = key_path
+        self._values: Dict[str, object] = {k: spec[1] for k, spec in FIELDS.items()}
+        self._subscribers: List[Callable[[Dict[str, object]], None]] = []
+        self._lock = threading.RLock()
+        self._fernet = None
+        self._cipher_error = ""
+        self._key_stamp = None  # состояние источника ключа, из которого получены _fernet/_cipher_error
+        self._last_failure = ""
+        self._has_encrypted = False
+        # секреты, которые не удалось расшифровать: ключ -> исходная строка enc:...
+        self._undecrypted: Dict[str, str] = {}
+        self._stamp = None
+        self._watch_stop = threading.Event()
+        self._watch_thread: threading.Thread | None = None
+        self.load()
+
+    # ---------- чтение ----------
+    def get(self, key: str):
+        with self._lock:
+            return self._values[key]
+
+    def __getitem__(self, key: str):
+        return self.get(key)
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            return dict(self._values)
+
+    # ---------- шифрование ----------
+    def _key_source_stamp(self):
+        try:
+            st = os.stat(self.key_path)
+            key_file = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            key_file = None
+        return os.environ.get(KEY_ENV, ""), key_file
+
+    def _cipher(self):
+        if Fernet is None:
+            self._cipher_error = "cryptography не установлен — pip install cryptography"
+            return None
+        stamp = self._key_source_stamp()
+        if stamp != self._key_stamp:
+            # ключ поменяли (вернули файл, задали переменную) — перечитываем
+            self._fernet = None
+            self._cipher_error = ""
+            self._key_stamp = stamp
+        if self._fernet is None and not self._cipher_error:
+            env_key = stamp[0]
+            try:
+                if env_key:
+                    key = env_key.encode()
+                elif stamp[1] is not None:
+                    with open(self.key_path, "rb") as f:
+                        key = f.read().strip()
+                elif self._has_encrypted:
+                    # новый ключ не расшифрует старые значения — не создаём его
+                    self._cipher_error = f"нет {self.key_path} и {KEY_ENV}, а в {self.path} есть зашифрованные значения"
+                    return None
+                else:
+                    key = Fernet.generate_key()
+                    fd = os.open(self.key_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+                    with os.fdopen(fd, "wb") as f:
+                        f.write(key)
+                    self._key_stamp = self._key_source_stamp()
+                self._fernet = Fernet(key)
+            except Exception as e:
+                source = KEY_ENV if env_key else self.key_path
+                self._cipher_error = f"неверный ключ в {source}: {e}"
+        return self._fernet
+
+    def _decode(self, key: str, raw):
+        """:return: (значение, удалось ли расшифровать)"""
+        if isinstance(raw, str) and raw.startswith(ENC_PREFIX):
+            cipher = self._cipher()
+            if cipher is None:
+                return FIELDS[key][1], False
+            try:
+                return cipher.decrypt(raw[len(ENC_PREFIX):].encode()).decode("utf-8"), True
+            except InvalidToken:
+                # ключ рабочий, но не тот; до смены источника ключа больше не пробуем
+                source = KEY_ENV if self._key_stamp[0] else self.key_path
+                self._fernet = None
+                self._cipher_error = f"ключ в {source} не подходит к сохранённым значениям"
+                return FIELDS[key][1], False
+        return raw, True
+
+    def _encode(self, key: str, value):
+        if key in self._undecrypted:
+            return self._undecrypted[key]
+        if FIELDS[key][2] and value and self._values.get("encrypt_secrets"):
+            cipher = self._cipher()
+            if cipher is not None:
+                return ENC_PREFIX + cipher.encrypt(str(value).encode("utf-8")).decode()
+        return value
+
+    # ---------- файл ----------
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.path)
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return None
+
+    @staticmethod
+    def _coerce(key: str, value):
+        typ, default = FIELDS[key][0], FIELDS[key][1]
+        if value is None:
+            return default
+        if typ is bool and isinstance(value, str):
+            return value.strip().lower() in ("1", "true", "yes", "on")
+        try:
+            value = typ(value)
+        except (TypeError, ValueError):
+            return default
+        return value.strip() if typ is str else value
+
+    def _read_values(self):
+        """:return: (значения, нерасшифрованные секреты) или None при ошибке чтения"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            self.log(f"[config] Не удалось прочитать {self.path}: {e}")
+            return None
+        values = {k: spec[1] for k, spec in FIELDS.items()}
+        undecrypted = {}
+        stored = data.get("values", {}) if isinstance(data, dict) else {}
+        self._has_encrypted = any(isinstance(v, str) and v.startswith(ENC_PREFIX) for v in stored.values())
+        for key in FIELDS:
+            if key in stored:
+                value, ok = self._decode(key, stored[key])
+                if ok:
+                    values[key] = self._coerce(key, value)
+                else:
+                    undecrypted[key] = stored[key]
+        failure = f"не расшифрованы {', '.join(sorted(undecrypted))}: {self._cipher_error}" if undecrypted else ""
+        if failure and failure != self._last_failure:
+            self.log(f"[config] {failure}")
+        self._last_failure = failure
+        return values, undecrypted
+
+    def _migrate_legacy(self) -> List[str]:
+        migrated = []
+        for key, (_, _, _, legacy) in FIELDS.items():
+            if legacy and os.path.exists(legacy):
+                try:
+                    with open(legacy, "r", encoding="utf-8") as f:
+                        self._values[key] = self._coerce(key, f.read())
+                    migrated.append(legacy)
+                except Exception as e:
+                    self.log(f"[config] Не удалось прочитать {legacy}: {e}")
+        return migrated
+
+    def load(self):
+        with self._lock:
+            if os.path.exists(self.path):
+                result = self._read_values()
+                if result is not None:
+                    self._values, self._undecrypted = result
+                    self._stamp = self._file_stamp()
+                return
+            migrated = self._migrate_legacy()
+            if migrated and self.save():
+                self.log(f"[config] Настройки перенесены из .txt в {self.path}")
+                # старые файлы лежат открытым текстом — после успешной записи удаляем
+                removed = []
+                for legacy in migrated:
+                    try:
+                        os.remove(legacy)
+                        removed.append(legacy)
+                    except OSError as e:
+                        self.log(f"[config] Не удалось удалить {legacy}: {e}")
+                if removed:
+                    self.log(f"[config] Удалены старые файлы: {', '.join(removed)}")
+
+    def save(self) -> bool:
+        """Атомарная запись: временный файл рядом + os.replace."""
+        with self._lock:
+            if self._undecrypted:
+                # иначе пустые значения затрут секреты, которые ещё можно расшифровать верным ключом
+                self.log(f"[config] Сохранение отключено: не расшифрованы {', '.join(sorted(self._undecrypted))}. "
+                         f"Верните {self.key_path} или задайте {KEY_ENV}.")
+                return False
+            payload = {"version": 1, "values": {k: self._encode(k, v) for k, v in self._values.items()}}
+            folder = os.path.dirname(os.path.abspath(self.path))
+            try:
+                fd, tmp = tempfile.mkstemp(prefix=".config-", suffix=".tmp", dir=folder)
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(payload, f, ensure_ascii=False, indent=2)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.path)
+                self._stamp = self._file_stamp()
+                return True
+            except Exception as e:
+                self.log(f"[config] Ошибка записи {self.path}: {e}")
+                return False
+
+    def update(self, **values) -> bool:
+        """
+        Меняет значения и сохраняет их. Подписчики узнают только об изменившихся ключах
+        и только если запись удалась — иначе значения откатываются.
+        :return: сохранено ли (True и когда менять было нечего)
+        """
+        changed = {}
+        with self._lock:
+            previous = dict(self._values)
+            previous_undecrypted = dict(self._undecrypted)
+            for key, value in values.items():
+                if key not in FIELDS:
+                    raise KeyError(key)
+                value = self._coerce(key, value)
+                if self._values[key] != value:
+                    self._values[key] = value
+                    self._undecrypted.pop(key, None)  # секрет задан заново
+                    changed[key] = value
+            if not changed:
+                return True
+            if previous_undecrypted and not self._undecrypted:
+                # все нерасшифрованные секреты заменены — старый ключ больше не нужен
+                self._has_encrypted = False
+                self._key_stamp = None
+            if not self.save():
+                self._values = previous
+                self._undecrypted = previous_undecrypted
+                return False
+        self._notify(changed)
+        return True
+
+    # ---------- подписки и слежение ----------
+    def subscribe(self, cb: Callable[[Dict[str, object]], None]):
+        self._subscribers.append(cb)
+
+    def _notify(self, changed: Dict[str, object]):
+        for cb in list(self._subscribers):
+            try:
+                cb(changed)
+            except Exception as e:
+                self.log(f"[config] Ошибка подписчика: {e}")
+
+    def check_external_change(self):
+        stamp = self._file_stamp()
+        with self._lock:
+            # если секреты не расшифрованы, перечитываем и без правок файла — ключ могли вернуть
+            key_back = self._undecrypted and self._key_source_stamp() != self._key_stamp
+            if stamp is None or (stamp == self._stamp and not key_back):
+                return {}
+            self._stamp = stamp
+            result = self._read_values()
+            if result is None:
+                return {}
+            values, self._undecrypted = result
+            changed = {k: v for k, v in values.items() if self._values.get(k) != v}
+            self._values = values
+        if changed:
+            self.log(f"[config] Файл изменён извне: {', '.join(sorted(changed))}")
+            self._notify(changed)
+        return changed
+
+    def start_watching(self, interval: float = 2.0):
+        if self._watch_thread and self._watch_thread.is_alive():
+            return
+        self._watch_stop.clear()
+
+        def loop():
+            while not self._watch_stop.wait(interval):
+                self.check_external_change()
+
+        self._watch_thread = threading.Thread(target=loop, name="config-watch", daemon=True)
+        self._watch_thread.start()
+
+    def stop_watching(self):
+        self._watch_stop.set()
@@ -0,0 +1,238 @@
+# event_journal.py
+"""
+Журнал событий: каждое событие слушателя и результат его обработки
+пишутся в сжатые сегменты journal/events-*.jsonl.gz (только дозапись,
+ротация по размеру, старые сегменты удаляются). Тексты наших собственных
+сообщений (в том числе выданные товары и пароли) и последнее сообщение в
+списке чатов в журнал не попадают — вместо них пишется HIDDEN.
+
+Повтор (replay) прогоняет журнал через обработчики приветствия и автовыдачи
+с исходными паузами или ускоренно; отправка сообщений при этом заглушена.
+"""
+from __future__ import annotations
+import os, enum, glob, gzip, json, time, threading, zlib
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Callable, Dict, Iterator, List, Optional
+
+JOURNAL_DIR = "journal"
+HIDDEN = "[скрыто]"
+
+
+def event_type_name(event) -> str:
+    t = getattr(event, "type", None)
+    return getattr(t, "name", str(t))
+
+
+def _plain(obj, depth: int = 0):
+    """Снимок простых полей объекта FunPayAPI (вложенность ограничена)."""
+    if obj is None or isinstance(obj, (str, int, float, bool)):
+        return obj
+    if isinstance(obj, enum.Enum):
+        return obj.name
+    if isinstance(obj, (list, tuple)):
+        return [_plain(v, depth + 1) for v in obj] if depth < 2 else None
+    if not hasattr(obj, "__dict__") or depth >= 3:
+        return str(obj)
+    return {k: _plain(v, depth + 1) for k, v in vars(obj).items() if not k.startswith("_")}
+
+
+def _redact(data, own_id):
+    """Прячет тексты, которые может содержать наша же автовыдача."""
+    if not isinstance(data, dict):
+        return data
+    message = data.get("message")
+    if isinstance(message, dict) and own_id is not None and message.get("author_id") == own_id:
+        for k in ("text", "html"):
+            if message.get(k) is not None:
+                message[k] = HIDDEN
+    chat = data.get("chat")
+    if isinstance(chat, dict):
+        # автора последнего сообщения список чатов не сообщает — прячем всегда
+        for k in ("last_message_text", "html"):
+            if chat.get(k) is not None:
+                chat[k] = HIDDEN
+    return data
+
+
+class EventJournal:
+    def __init__(self, log, folder: str = JOURNAL_DIR, max_bytes: int = 4 * 1024 * 1024, keep_segments: int = 50):
+        self.log = log
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.keep_segments = keep_segments
+        self._lock = threading.Lock()
+        self._fh: gzip.GzipFile | None = None
+        self._written = 0
+        self._sessions: Dict[str, dict] = {}
+
+    def _open_segment(self):
+        os.makedirs(self.folder, exist_ok=True)
+        name = datetime.now().strftime("events-%Y%m%d-%H%M%S-%f.jsonl.gz")
+        self._fh = gzip.open(os.path.join(self.folder, name), "ab")
+        self._written = 0
+        segments = sorted(glob.glob(os.path.join(self.folder, "events-*.jsonl.gz")))
+        for old in segments[:-self.keep_segments]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+    def _write_line(self, record: dict):
+        line = (json.dumps(record, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+        self._fh.write(line)
+
+    def _write(self, record: dict):
+        with self._lock:
+            try:
+                if self._fh is None or self._written >= self.max_bytes:
+                    self.close_segment()
+                    self._open_segment()
+                    # каждый сегмент самодостаточен для повтора: повторяем записи сессий
+                    for session in self._sessions.values():
+                        if session is not record:
+                            self._write_line(session)
+                self._write_line(record)
+                # после каждой записи сегмент читаем, даже если процесс упадёт
+                self._fh.flush(zlib.Z_SYNC_FLUSH)
+                # ротация по размеру сжатого файла на диске
+                self._written = self._fh.fileobj.tell()
+            except Exception as e:
+                self.log(f"[journal] Ошибка записи: {e}")
+
+    def close_segment(self):
+        if self._fh is not None:
+            try:
+                self._fh.close()
+            except Exception:
+                pass
+            self._fh = None
+
+    def close(self):
+        with self._lock:
+            self.close_segment()
+
+    def record_session(self, source: str, acc):
+        record = {"ts": time.time(), "kind": "session", "source": source,
+                  "account_id": getattr(acc, "id", None)}
+        self._sessions[source] = record
+        self._write(record)
+
+    def record_event(self, source: str, event):
+        own_id = self._sessions.get(source, {}).get("account_id")
+        self._write({"ts": time.time(), "kind": "event", "source": source,
+                     "type": event_type_name(event), "data": _redact(_plain(event), own_id)})
+
+    def record_outcome(self, source: str, event, ok: bool, info: str):
+        self._write({"ts": time.time(), "kind": "outcome", "source": source,
+                     "type": event_type_name(event), "ok": ok, "info": info})
+
+
+def read_journal(path: str) -> Iterator[dict]:
+    """Записи из сегмента или из всех сегментов папки, по порядку."""
+    paths = sorted(glob.glob(os.path.join(path, "events-*.jsonl.gz"))) if os.path.isdir(path) else [path]
+    for p in paths:
+        try:
+            with gzip.open(p, "rt", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+        except (EOFError, gzip.BadGzipFile, json.JSONDecodeError):
+            # незакрытый или обрезанный сегмент — читаем то, что успело записаться
+            continue
+
+
+def _namespace(value):
+    if isinstance(value, dict):
+        return SimpleNamespace(**{k: _namespace(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return [_namespace(v) for v in value]
+    return value
+
+
+def rebuild_event(record: dict, enums=None):
+    """Событие из записи журнала; тип — настоящий EventTypes, если FunPayAPI установлен."""
+    event = _namespace(record.get("data") or {})
+    if not isinstance(event, SimpleNamespace):
+        event = SimpleNamespace()
+    name = record.get("type", "")
+    event_type = None
+    if enums is not None:
+        event_type = getattr(enums.EventTypes, name, None)
+    event.type = event_type or SimpleNamespace(name=name)
+    return event
+
+
+class ReplayAccount:
+    """Заглушка Account: ничего не отправляет, только считает и логирует."""
+    def __init__(self, account_id, log):
+        self.id = account_id
+        self.log = log
+        self.sent = 0
+
+    def send_message(self, chat_id, text, *args, **kwargs):
+        self.sent += 1
+        self.log(f"[replay] → чат {chat_id}: {text[:60]!r}")
+
+    def get_chat_by_name(self, name, *args, **kwargs):
+        return None
+
+
+class ReplayNotifier:
+    def __init__(self, log):
+        self.log = log
+
+    def broadcast(self, text: str):
+        self.log(f"[replay] notify: {text}")
+
+
+def replay(records, handlers: Dict[str, Callable], log, speed: float = 1.0,
+           stop_event=None, enums=None, sleep=time.sleep, max_gap: float = 60.0) -> Dict[str, int]:
+    """
+    Прогоняет события журнала через обработчики.
+    :param handlers: source -> handler(acc, event), возвращает (ok, info) или None
+    :param speed: 1.0 — исходный темп, 10.0 — в 10 раз быстрее, 0 — без пауз
+    :param max_gap: паузы длиннее (например, между сессиями слушателя) сокращаются до max_gap секунд
+    :return: счётчики событий и результатов
+    """
+    stats = {"events": 0, "ok": 0, "failed": 0, "ignored": 0}
+    acc = ReplayAccount(None, log)
+    prev_ts: Optional[float] = None
+    started = time.monotonic()
+    for rec in records:
+        if stop_event is not None and stop_event.is_set():
+            break
+        if rec.get("kind") == "session":
+            acc.id = rec.get("account_id")
+            continue
+        if rec.get("kind") != "event":
+            continue
+        ts = rec.get("ts")
+        if speed > 0 and prev_ts is not None and ts is not None and ts > prev_ts:
+            delay = min(ts - prev_ts, max_gap) / speed
+            if stop_event is not None:
+                if stop_event.wait(delay):
+                    break
+            else:
+                sleep(delay)
+        prev_ts = ts
+        event = rebuild_event(rec, enums)
+        source = rec.get("source")
+        targets: List[Callable] = [handlers[source]] if source in handlers else list(handlers.values())
+        stats["events"] += 1
+        for handler in targets:
+            try:
+                result = handler(acc, event)
+            except Exception as e:
+                result = (False, str(e))
+            if result is None:
+                stats["ignored"] += 1
+            elif result[0]:
+                stats["ok"] += 1
+            else:
+                stats["failed"] += 1
+                log(f"[replay] {result[1]}")
+    elapsed = time.monotonic() - started
+    log(f"[replay] Событий: {stats['events']}, ok: {stats['ok']}, ошибок: {stats['failed']}, "
+        f"пропущено: {stats['ignored']}, отправок: {acc.sent}, за {elapsed:.1f} с")
+    return stats
@@ -5,7 +5,7 @@ FunPay Helper — улучшенный GUI + парс активных прод
 Запуск: python funpay_helper.py
 """
 from __future__ import annotations
-import os, sys, json, threading, subprocess
+import os, sys, json, threading
 from datetime import datetime
 
 try:
@@ -19,56 +19,41 @@ import requests
 from PySide6 import QtCore, QtGui, QtWidgets
 from PySide6.QtCore import Qt
 from store_fetcher import get_active_lots, export_autodelivery_json
+from plugins import PluginManager
+from config_store import ConfigStore
+from event_journal import JOURNAL_DIR, EventJournal, event_type_name, read_journal, replay, ReplayNotifier
+from analytics import SalesAnalytics
+from lot_manager import RULES_PATH, load_rules, load_pools, plan_changes, apply_changes, take_pool_item, return_pool_item
 
 APP_NAME = "FunPay Helper"
 
 FILES = {
-    "golden_key": "goldenkey.txt",
-    "first_message": "message.txt",
-    "account_name": "accountname.txt",
-    "mail": "account1mail.txt",
-    "password": "account1pass.txt",
-    "discord_webhook": "discord_webhook.txt",
-    "tg_bot_token": "telegram_token.txt",
-    "tg_chat_id": "telegram_chat_id.txt",
     "autodelivery_json": "autodelivery_items.json",
 }
 
-def read_file(path: str, default: str = "") -> str:
-    try:
-        if os.path.exists(path):
-            with open(path, "r", encoding="utf-8") as f:
-                return f.read().strip()
-    except Exception:
-        pass
-    return default
-
-def write_file(path: str, value: str) -> None:
-    try:
-        with open(path, "w", encoding="utf-8") as f:
-            f.write(value or "")
-    except Exception:
-        pass
-
 # ---------------------------- Notifications ----------------------------
 class Notifier:
-    def __init__(self, console_cb):
+    def __init__(self, console_cb, config: ConfigStore):
         self.console_cb = console_cb
-        self.discord_webhook = read_file(FILES["discord_webhook"]) or ""
-        self.tg_bot_token = read_file(FILES["tg_bot_token"]) or ""
-        self.tg_chat_id = read_file(FILES["tg_chat_id"]) or ""
+        self.config = config
+        self._apply(config.snapshot())
+        config.subscribe(self._apply)
+
+    def _apply(self, values: dict):
+        # вызывается и при сохранении из GUI, и при правке config.json извне
+        if "discord_webhook" in values:
+            self.discord_webhook = values["discord_webhook"]
+        if "tg_bot_token" in values:
+            self.tg_bot_token = values["tg_bot_token"]
+        if "tg_chat_id" in values:
+            self.tg_chat_id = values["tg_chat_id"]
 
     def log(self, msg: str):
         if self.console_cb:
             self.console_cb(msg)
 
-    def save(self, discord_webhook: str, tg_token: str, tg_chat_id: str):
-        self.discord_webhook = discord_webhook.strip()
-        self.tg_bot_token = tg_token.strip()
-        self.tg_chat_id = tg_chat_id.strip()
-        write_file(FILES["discord_webhook"], self.discord_webhook)
-        write_file(FILES["tg_bot_token"], self.tg_bot_token)
-        write_file(FILES["tg_chat_id"], self.tg_chat_id)
+    def save(self, discord_webhook: str, tg_token: str, tg_chat_id: str) -> bool:
+        return self.config.update(discord_webhook=discord_webhook, tg_bot_token=tg_token, tg_chat_id=tg_chat_id)
 
     def send_discord(self, content: str):
         if not self.discord_webhook:
@@ -138,53 +123,76 @@ class Console(QtWidgets.QPlainTextEdit):
         self.appendPlainText(f"[{ts}] {text}")
         self.verticalScrollBar().setValue(self.verticalScrollBar().maximum())
 
-# ---------------------------- Workers (как в вашей версии) ----------------------------
-class ExternalScriptRunner(QtCore.QThread):
-    message = QtCore.Signal(str)
-
-    def __init__(self, script_path: str, debug_to_console: bool):
+# ---------------------------- Bar Chart ----------------------------
+class BarChart(QtWidgets.QWidget):
+    """Простая ч/б гистограмма на QPainter — без QtCharts."""
+    def __init__(self, title: str):
         super().__init__()
-        self.script_path = script_path
-        self.debug_to_console = debug_to_console
-        self._proc: subprocess.Popen | None = None
-
-    def run(self):
-        if not os.path.exists(self.script_path):
-            self.message.emit(f"External script not found: {self.script_path}")
+        self.title = title
+        self.items: list[tuple[str, float]] = []
+        self.setMinimumHeight(180)
+
+    def set_items(self, items):
+        self.items = list(items)
+        self.update()
+
+    def paintEvent(self, e):
+        p = QtGui.QPainter(self)
+        p.setRenderHint(QtGui.QPainter.Antialiasing)
+        rect = self.rect().adjusted(8, 8, -8, -8)
+        p.setPen(QtGui.QPen(Qt.black))
+        p.drawText(rect.left(), rect.top() + 12, self.title)
+        area = rect.adjusted(0, 24, 0, -18)
+        if not self.items or area.width() <= 0:
+            p.drawText(area, Qt.AlignCenter, "нет данных")
             return
-        self.message.emit(f"Starting external script: {os.path.basename(self.script_path)}")
-        try:
-            self._proc = subprocess.Popen([sys.executable, self.script_path],
-                                          stdout=subprocess.PIPE,
-                                          stderr=subprocess.STDOUT,
-                                          text=True,
-                                          bufsize=1)
-            if self.debug_to_console and self._proc.stdout:
-                for line in self._proc.stdout:
-                    self.message.emit(line.rstrip())
-            self._proc.wait()
-            self.message.emit(f"External script exited with code {self._proc.returncode}")
-        except Exception as e:
-            self.message.emit(f"External script error: {e}")
-
-    def stop(self):
-        if self._proc and self._proc.poll() is None:
-            try:
-                self._proc.terminate()
-            except Exception:
-                pass
+        top = max(v for _, v in self.items) or 1
+        step = area.width() / len(self.items)
+        bar = max(1.0, step * 0.7)
+        label_every = max(1, int(len(self.items) / max(1, area.width() // 60)))
+        for i, (label, value) in enumerate(self.items):
+            h = area.height() * (value / top)
+            x = area.left() + i * step + (step - bar) / 2
+            p.fillRect(QtCore.QRectF(x, area.bottom() - h, bar, h), Qt.black)
+            if i % label_every == 0:
+                p.drawText(QtCore.QRectF(area.left() + i * step, area.bottom() + 2, step * label_every, 16),
+                           Qt.AlignLeft, str(label)[:12])
 
+# ---------------------------- Workers (как в вашей версии) ----------------------------
 class FunPayWelcomeWorker(QtCore.QThread):
     message = QtCore.Signal(str)
     event_info = QtCore.Signal(str)
 
-    def __init__(self, token: str, greeting: str, notifier: Notifier):
+    def __init__(self, token: str, greeting: str, notifier: Notifier, plugins: PluginManager | None = None,
+                 journal: EventJournal | None = None):
         super().__init__()
         self.token = token
         self.greeting = greeting
         self.notifier = notifier
+        self.plugins = plugins
+        self.journal = journal
         self._stop = threading.Event()
 
+    def handle_event(self, acc, event):
+        """
+        Приветствие на входящее сообщение. Используется и слушателем, и повтором журнала.
+        :return: (ok, info) или None, если событие не требует действий
+        """
+        if event_type_name(event) != "NEW_MESSAGE":
+            return None
+        try:
+            if hasattr(event, 'message') and getattr(event.message, 'author_id', None) != acc.id:
+                chat_id = event.message.chat_id
+                acc.send_message(chat_id, self.greeting)
+                info = f"Greeting sent to chat {chat_id}"
+                self.event_info.emit(info)
+                self.notifier.broadcast(f"💬 {info}")
+                return True, info
+        except Exception as e:
+            self.message.emit(f"[Welcome] Error: {e}")
+            return False, f"[Welcome] Error: {e}"
+        return None
+
     def run(self):
         if FunPayAPI is None:
             self.message.emit("FunPayAPI not installed — install with: pip install FunPayAPI")
@@ -192,21 +200,22 @@ class FunPayWelcomeWorker(QtCore.QThread):
         try:
             acc = Account(self.token).get()
             runner = Runner(acc)
+            if self.plugins:
+                self.plugins.attach(acc)
+            if self.journal:
+                self.journal.record_session("welcome", acc)
             self.message.emit("Welcome listener started.")
             self.notifier.broadcast("✅ Welcome listener started")
             for event in runner.listen(requests_delay=4):
                 if self._stop.is_set():
                     break
-                if event.type is enums.EventTypes.NEW_MESSAGE:
-                    try:
-                        if hasattr(event, 'message') and getattr(event.message, 'author_id', None) != acc.id:
-                            chat_id = event.message.chat_id
-                            acc.send_message(chat_id, self.greeting)
-                            info = f"Greeting sent to chat {chat_id}"
-                            self.event_info.emit(info)
-                            self.notifier.broadcast(f"💬 {info}")
-                    except Exception as e:
-                        self.message.emit(f"[Welcome] Error: {e}")
+                if self.journal:
+                    self.journal.record_event("welcome", event)
+                if self.plugins:
+                    self.plugins.dispatch(event)
+                result = self.handle_event(acc, event)
+                if result and self.journal:
+                    self.journal.record_outcome("welcome", event, *result)
         except Exception as e:
             self.message.emit(f"[Welcome] Fatal: {e}")
         finally:
@@ -220,38 +229,60 @@ class FunPayAutoDeliverWorker(QtCore.QThread):
     message = QtCore.Signal(str)
     event_info = QtCore.Signal(str)
 
-    def __init__(self, token: str, account_name_filter: str, mail: str, password: str, notifier: Notifier):
+    def __init__(self, token: str, account_name_filter: str, mail: str, password: str, notifier: Notifier,
+                 plugins: PluginManager | None = None, journal: EventJournal | None = None,
+                 analytics: SalesAnalytics | None = None, take_from_pool: bool = True):
         super().__init__()
         self.token = token
         self.account_name_filter = account_name_filter
         self.mail = mail
         self.password = password
         self.notifier = notifier
+        self.plugins = plugins
+        self.journal = journal
+        self.analytics = analytics
+        # False при повторе журнала: товар из пула только показывается, файл не меняется
+        self.take_from_pool = take_from_pool
         self._stop = threading.Event()
 
     def _send_autodelivery_for_order(self, acc, order, buyer_name: str):
         """
         Пример: пытаемся найти запись в autodelivery_items.json по subcategory/title,
-        иначе — шлём дефолт из настроек.
+        иначе — шлём дефолт из настроек. Если у записи есть delivery_pool, выдаётся
+        первый товар из него (он снимается с пула, при неудачной отправке возвращается).
         """
+        path = FILES["autodelivery_json"]
         delivery_text = ""
+        item = None
+        title = getattr(order, "short_description", getattr(order, "description", "")) or ""
+        subc = getattr(order, "subcategory_name", getattr(getattr(order, "subcategory", None), "name", ""))
+
+        def match(it):
+            # простая эвристика: точное совпадение title либо подкатегории
+            return it.get("title") == title or it.get("subcategory") == subc
+
         try:
-            if os.path.exists(FILES["autodelivery_json"]):
-                with open(FILES["autodelivery_json"], "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                title = getattr(order, "short_description", getattr(order, "description", "")) or ""
-                subc = getattr(order, "subcategory_name", getattr(getattr(order, "subcategory", None), "name", ""))
-                # простая эвристика: точное совпадение title либо подкатегории
-                for it in data:
-                    if it.get("title") == title or it.get("subcategory") == subc:
-                        delivery_text = it.get("delivery_text") or ""
-                        break
+            if os.path.exists(path):
+                if self.take_from_pool:
+                    entry, item = take_pool_item(path, match)
+                else:
+                    with open(path, "r", encoding="utf-8") as f:
+                        entry = next((it for it in json.load(f) if match(it)), None)
+                    pool = entry.get("delivery_pool") if entry else None
+                    item = pool[0] if isinstance(pool, list) and pool else None
+                if entry is not None:
+                    delivery_text = entry.get("delivery_text") or ""
+                    if isinstance(entry.get("delivery_pool"), list) and item is None:
+                        return False, f"Order from {buyer_name} matched, but delivery_pool is empty."
         except Exception as e:
             self.message.emit(f"[AutoDeliver] JSON read error: {e}")
 
+        if item is not None:
+            delivery_text = f"{delivery_text}\n{item}" if delivery_text else str(item)
         if not delivery_text:
             delivery_text = f"Привет, {buyer_name}!\nВот твой аккаунт:\nПочта: {self.mail}\nПароль: {self.password}"
 
+        result = False, f"Order from {buyer_name} matched, but no chat found."
         try:
             # попытка через order.chat_id, иначе через поиск чата
             chat_id = getattr(order, "chat_id", None)
@@ -265,8 +296,40 @@ class FunPayAutoDeliverWorker(QtCore.QThread):
                 acc.send_message(chat_id, delivery_text)
                 return True, f"Credentials sent to {buyer_name} (chat {chat_id})"
         except Exception as e:
-            return False, f"[AutoDeliver] send error: {e}"
-        return False, f"Order from {buyer_name} matched, but no chat found."
+            result = False, f"[AutoDeliver] send error: {e}"
+        if item is not None and self.take_from_pool:
+            try:
+                return_pool_item(path, match, item)
+            except Exception as e:
+                self.message.emit(f"[AutoDeliver] Не удалось вернуть товар в пул: {e}")
+        return result
+
+    def handle_event(self, acc, event):
+        """
+        Автовыдача по новому заказу. Используется и слушателем, и повтором журнала.
+        :return: (ok, info) или None, если заказ не подходит под фильтр
+        """
+        if event_type_name(event) != "NEW_ORDER":
+            return None
+        try:
+            order = event.order
+            if self.analytics:
+                self.analytics.record_order(order)
+            desc = getattr(order, 'description', '') or ''
+            buyer = getattr(order, 'buyer_username', 'buyer')
+            if self.account_name_filter and self.account_name_filter not in desc:
+                return None
+            ok, info = self._send_autodelivery_for_order(acc, order, buyer)
+            if self.analytics:
+                self.analytics.record_delivery(order, ok)
+            self.event_info.emit(info)
+            self.notifier.broadcast(("📦 " if ok else "⚠️ ") + info)
+            return ok, info
+        except Exception as e:
+            self.message.emit(f"[AutoDeliver] Error: {e}")
+            if self.analytics and getattr(event, "order", None) is not None:
+                self.analytics.record_delivery(event.order, False)
+            return False, f"[AutoDeliver] Error: {e}"
 
     def run(self):
         if FunPayAPI is None:
@@ -275,23 +338,22 @@ class FunPayAutoDeliverWorker(QtCore.QThread):
         try:
             acc = Account(self.token).get()
             runner = Runner(acc)
+            if self.plugins:
+                self.plugins.attach(acc)
+            if self.journal:
+                self.journal.record_session("autodelivery", acc)
             self.message.emit("Auto-delivery listener started.")
             self.notifier.broadcast("✅ Auto-delivery listener started")
             for event in runner.listen(requests_delay=4):
                 if self._stop.is_set():
                     break
-                if event.type is enums.EventTypes.NEW_ORDER:
-                    try:
-                        order = event.order
-                        desc = getattr(order, 'description', '') or ''
-                        buyer = getattr(order, 'buyer_username', 'buyer')
-                        if self.account_name_filter and self.account_name_filter not in desc:
-                            continue
-                        ok, info = self._send_autodelivery_for_order(acc, order, buyer)
-                        self.event_info.emit(info)
-                        self.notifier.broadcast(("📦 " if ok else "⚠️ ") + info)
-                    except Exception as e:
-                        self.message.emit(f"[AutoDeliver] Error: {e}")
+                if self.journal:
+                    self.journal.record_event("autodelivery", event)
+                if self.plugins:
+                    self.plugins.dispatch(event)
+                result = self.handle_event(acc, event)
+                if result and self.journal:
+                    self.journal.record_outcome("autodelivery", event, *result)
         except Exception as e:
             self.message.emit(f"[AutoDeliver] Fatal: {e}")
         finally:
@@ -301,8 +363,61 @@ class FunPayAutoDeliverWorker(QtCore.QThread):
     def stop(self):
         self._stop.set()
 
+class LotUpdateWorker(QtCore.QThread):
+    message = QtCore.Signal(str)
+
+    def __init__(self, token: str, edits: list):
+        super().__init__()
+        self.token = token
+        self.edits = edits
+        self._stop = threading.Event()
+
+    def run(self):
+        if FunPayAPI is None:
+            self.message.emit("FunPayAPI not installed — install with: pip install FunPayAPI")
+            return
+        try:
+            acc = Account(self.token).get()
+            apply_changes(acc, self.edits, self.message.emit, stop_event=self._stop)
+        except Exception as e:
+            self.message.emit(f"[lots] Fatal: {e}")
+
+    def stop(self):
+        self._stop.set()
+
+class JournalReplayWorker(QtCore.QThread):
+    message = QtCore.Signal(str)
+
+    def __init__(self, path: str, speed: float, greeting: str, account_name_filter: str, mail: str, password: str):
+        super().__init__()
+        self.path = path
+        self.speed = speed
+        self.greeting = greeting
+        self.account_name_filter = account_name_filter
+        self.mail = mail
+        self.password = password
+        self._stop = threading.Event()
+
+    def run(self):
+        self.message.emit(f"[replay] Повтор {self.path} (x{self.speed:g})")
+        notifier = ReplayNotifier(self.message.emit)
+        welcome = FunPayWelcomeWorker("", self.greeting, notifier)
+        auto = FunPayAutoDeliverWorker("", self.account_name_filter, self.mail, self.password, notifier,
+                                       take_from_pool=False)
+        handlers = {"welcome": welcome.handle_event, "autodelivery": auto.handle_event}
+        try:
+            replay(read_journal(self.path), handlers, self.message.emit, speed=self.speed,
+                   stop_event=self._stop, enums=enums)
+        except Exception as e:
+            self.message.emit(f"[replay] Fatal: {e}")
+
+    def stop(self):
+        self._stop.set()
+
 # ---------------------------- Main Window ----------------------------
 class MainWindow(QtWidgets.QMainWindow):
+    config_changed = QtCore.Signal(dict)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle(APP_NAME)
@@ -327,24 +442,41 @@ class MainWindow(QtWidgets.QMainWindow):
         self.tab_console = QtWidgets.QWidget()
         self.tab_notifications = QtWidgets.QWidget()
         self.tab_store = QtWidgets.QWidget()  # Новая вкладка
+        self.tab_analytics = QtWidgets.QWidget()
 
         self.tabs.addTab(self.tab_settings, "Настройки / Settings")
         self.tabs.addTab(self.tab_console, "Консоль / Console")
         self.tabs.addTab(self.tab_notifications, "Оповещения / Alerts")
         self.tabs.addTab(self.tab_store, "Магазин / Store")
+        self.tabs.addTab(self.tab_analytics, "Аналитика / Analytics")
 
         self._build_settings_tab()
         self._build_console_tab()
         self._build_notifications_tab()
         self._build_store_tab()
+        self._build_analytics_tab()
 
         # State
-        self.notifier = Notifier(self.console.append_line)
+        self.config = ConfigStore(self.console.append_line)
+        self.notifier = Notifier(self.console.append_line, self.config)
         self.welcome_worker: FunPayWelcomeWorker | None = None
         self.autodeliver_worker: FunPayAutoDeliverWorker | None = None
-        self.ext_runner: ExternalScriptRunner | None = None
+        self.lot_worker: LotUpdateWorker | None = None
+        self.replay_worker: JournalReplayWorker | None = None
+        self.journal = EventJournal(self.console.append_line)
+        self.analytics = SalesAnalytics()
+        self.analytics_timer = QtCore.QTimer(self)
+        self.analytics_timer.timeout.connect(self._refresh_analytics)
+        self.analytics_timer.start(2000)
+        self._lot_plan: list = []
+        self._lot_titles: dict = {}
+        self.plugins = PluginManager(self.console.append_line)
 
         self._load_initial_values()
+        # подписчики вызываются из потока слежения — в GUI переходим через сигнал
+        self.config_changed.connect(self._on_config_changed)
+        self.config.subscribe(self.config_changed.emit)
+        self.config.start_watching()
 
     # ---------- UI Builders ----------
     def _build_settings_tab(self):
@@ -362,10 +494,10 @@ class MainWindow(QtWidgets.QMainWindow):
         self.ed_password.setEchoMode(QtWidgets.QLineEdit.Password)
 
         # Labels
-        layout.addWidget(QtWidgets.QLabel("FunPay TOKEN (goldenkey.txt):"), 0, 0)
+        layout.addWidget(QtWidgets.QLabel("FunPay TOKEN:"), 0, 0)
         layout.addWidget(self.ed_token, 0, 1)
 
-        layout.addWidget(QtWidgets.QLabel("Приветственное сообщение / Greeting (message.txt):"), 1, 0)
+        layout.addWidget(QtWidgets.QLabel("Приветственное сообщение / Greeting:"), 1, 0)
         layout.addWidget(self.ed_first_message, 1, 1)
 
         layout.addWidget(QtWidgets.QLabel("Это бесплатная программа сделанная JoeGentov, если вы заплатили деньги, то вас обманули"), 2, 0)
@@ -390,26 +522,55 @@ class MainWindow(QtWidgets.QMainWindow):
         layout.addWidget(self.btn_start_auto, row, 1)
         layout.addWidget(self.btn_stop_all, row, 0)
 
-        # Script group
+        # Plugins group
         row += 1
-        grp = QtWidgets.QGroupBox("Загрузка скрипта с отладкой / External script with debug")
+        grp = QtWidgets.QGroupBox("Плагины / Plugins")
         gl = QtWidgets.QGridLayout(grp)
-        self.script_path_edit = QtWidgets.QLineEdit()
-        self.script_path_btn = AnimatedButton("Выбрать .py… / Browse…")
-        self.chk_debug_output = QtWidgets.QCheckBox("Отладка в консоли / Debug to console")
-        self.btn_run_script = AnimatedButton("▶ Запустить / Run")
-        self.btn_stop_script = AnimatedButton("■ Остановить / Stop")
+        self.plugin_path_edit = QtWidgets.QLineEdit()
+        self.plugin_path_btn = AnimatedButton("Выбрать .py… / Browse…")
+        self.btn_load_plugin = AnimatedButton("▶ Загрузить / Load")
+        self.btn_unload_plugins = AnimatedButton("■ Выгрузить все / Unload all")
+        self.lbl_plugins = QtWidgets.QLabel("Плагины получают события запущенных слушателей.")
 
-        self.script_path_btn.clicked.connect(self._choose_script)
-        self.btn_run_script.clicked.connect(self._run_external_script)
-        self.btn_stop_script.clicked.connect(self._stop_external_script)
+        self.plugin_path_btn.clicked.connect(self._choose_plugin)
+        self.btn_load_plugin.clicked.connect(self._load_plugin)
+        self.btn_unload_plugins.clicked.connect(self._unload_plugins)
 
         gl.addWidget(QtWidgets.QLabel("Путь к .py:"), 0, 0)
-        gl.addWidget(self.script_path_edit, 0, 1)
-        gl.addWidget(self.script_path_btn, 0, 2)
-        gl.addWidget(self.chk_debug_output, 1, 1)
-        gl.addWidget(self.btn_run_script, 2, 1)
-        gl.addWidget(self.btn_stop_script, 2, 2)
+        gl.addWidget(self.plugin_path_edit, 0, 1)
+        gl.addWidget(self.plugin_path_btn, 0, 2)
+        gl.addWidget(self.lbl_plugins, 1, 1)
+        gl.addWidget(self.btn_load_plugin, 2, 1)
+        gl.addWidget(self.btn_unload_plugins, 2, 2)
+        layout.addWidget(grp, row, 0, 1, 2)
+
+        # Journal group
+        row += 1
+        grp = QtWidgets.QGroupBox("Журнал событий / Event journal")
+        gl = QtWidgets.QGridLayout(grp)
+        self.chk_journal = QtWidgets.QCheckBox("Писать журнал (journal/) / Record events")
+        self.chk_journal.setChecked(True)
+        self.replay_path_edit = QtWidgets.QLineEdit(JOURNAL_DIR)
+        self.replay_path_btn = AnimatedButton("Выбрать… / Browse…")
+        self.spin_replay_speed = QtWidgets.QDoubleSpinBox()
+        self.spin_replay_speed.setRange(0, 1000)
+        self.spin_replay_speed.setValue(1.0)
+        self.spin_replay_speed.setSpecialValueText("макс. / max")
+        self.btn_replay = AnimatedButton("▶ Повтор / Replay")
+        self.btn_stop_replay = AnimatedButton("■ Остановить / Stop")
+
+        self.replay_path_btn.clicked.connect(self._choose_journal)
+        self.btn_replay.clicked.connect(self._start_replay)
+        self.btn_stop_replay.clicked.connect(self._stop_replay)
+
+        gl.addWidget(self.chk_journal, 0, 1)
+        gl.addWidget(QtWidgets.QLabel("Журнал:"), 1, 0)
+        gl.addWidget(self.replay_path_edit, 1, 1)
+        gl.addWidget(self.replay_path_btn, 1, 2)
+        gl.addWidget(QtWidgets.QLabel("Скорость:"), 2, 0)
+        gl.addWidget(self.spin_replay_speed, 2, 1)
+        gl.addWidget(self.btn_replay, 3, 1)
+        gl.addWidget(self.btn_stop_replay, 3, 2)
         layout.addWidget(grp, row, 0, 1, 2)
 
     def _build_console_tab(self):
@@ -430,9 +591,9 @@ class MainWindow(QtWidgets.QMainWindow):
     def _build_notifications_tab(self):
         layout = QtWidgets.QGridLayout(self.tab_notifications)
         layout.setContentsMargins(16, 16, 16, 16)
-        self.ed_webhook = QtWidgets.QLineEdit(read_file(FILES["discord_webhook"]))
-        self.ed_tg_token = QtWidgets.QLineEdit(read_file(FILES["tg_bot_token"]))
-        self.ed_tg_chat = QtWidgets.QLineEdit(read_file(FILES["tg_chat_id"]))
+        self.ed_webhook = QtWidgets.QLineEdit()
+        self.ed_tg_token = QtWidgets.QLineEdit()
+        self.ed_tg_chat = QtWidgets.QLineEdit()
 
         layout.addWidget(QtWidgets.QLabel("Discord Webhook URL:"), 0, 0)
         layout.addWidget(self.ed_webhook, 0, 1)
@@ -469,6 +630,16 @@ class MainWindow(QtWidgets.QMainWindow):
         top.addWidget(self.btn_export_json)
         layout.addLayout(top)
 
+        rules = QtWidgets.QHBoxLayout()
+        self.ed_rules_path = QtWidgets.QLineEdit(RULES_PATH)
+        self.btn_plan_lots = AnimatedButton("🧮 План цен/остатков (dry-run)")
+        self.btn_apply_lots = AnimatedButton("✔ Применить план")
+        rules.addWidget(QtWidgets.QLabel("Правила:"))
+        rules.addWidget(self.ed_rules_path)
+        rules.addWidget(self.btn_plan_lots)
+        rules.addWidget(self.btn_apply_lots)
+        layout.addLayout(rules)
+
         # Таблица
         self.table = QtWidgets.QTableWidget(0, 6)
         self.table.setHorizontalHeaderLabels(["Тип", "ID/lot_id", "Название", "Цена", "Остаток", "delivery_text"])
@@ -485,26 +656,83 @@ class MainWindow(QtWidgets.QMainWindow):
         self.btn_load_lots.clicked.connect(self._load_active_lots)
         self.btn_export_json.clicked.connect(self._export_json)
         self.btn_browse_json.clicked.connect(self._browse_json)
+        self.btn_plan_lots.clicked.connect(self._plan_lots)
+        self.btn_apply_lots.clicked.connect(self._apply_lots)
+
+    def _build_analytics_tab(self):
+        layout = QtWidgets.QVBoxLayout(self.tab_analytics)
+        layout.setContentsMargins(16, 16, 16, 16)
+
+        self.lbl_analytics = QtWidgets.QLabel("Запустите автовыдачу — статистика копится по мере заказов (окно 24 ч).")
+        layout.addWidget(self.lbl_analytics)
+
+        charts = QtWidgets.QHBoxLayout()
+        self.chart_orders = BarChart("Заказы в час / Orders per hour")
+        self.chart_subcategory = BarChart("Выручка по подкатегориям / Revenue by subcategory")
+        charts.addWidget(self.chart_orders)
+        charts.addWidget(self.chart_subcategory)
+        layout.addLayout(charts)
+
+        self.table_revenue = QtWidgets.QTableWidget(0, 3)
+        self.table_revenue.setHorizontalHeaderLabels(["lot_id", "Название", "Выручка"])
+        self.table_revenue.horizontalHeader().setStretchLastSection(True)
+        self.table_revenue.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        layout.addWidget(self.table_revenue)
 
     # ---------- Helpers ----------
     def _load_initial_values(self):
-        self.ed_token.setText(read_file(FILES["golden_key"]))
-        self.ed_first_message.setPlainText(read_file(FILES["first_message"]))
-        self.ed_account_name.setText(read_file(FILES["account_name"]))
-        self.ed_mail.setText(read_file(FILES["mail"]))
-        self.ed_password.setText(read_file(FILES["password"]))
+        self._apply_config_to_widgets(self.config.snapshot())
+
+    def _apply_config_to_widgets(self, values: dict):
+        line_edits = {
+            "golden_key": self.ed_token,
+            "account_name": self.ed_account_name,
+            "mail": self.ed_mail,
+            "password": self.ed_password,
+            "discord_webhook": self.ed_webhook,
+            "tg_bot_token": self.ed_tg_token,
+            "tg_chat_id": self.ed_tg_chat,
+        }
+        for key, edit in line_edits.items():
+            if key in values and edit.text() != values[key]:
+                edit.setText(values[key])
+        if "first_message" in values and self.ed_first_message.toPlainText() != values["first_message"]:
+            self.ed_first_message.setPlainText(values["first_message"])
+
+    @QtCore.Slot(dict)
+    def _on_config_changed(self, changed: dict):
+        self._apply_config_to_widgets(changed)
+        # запущенные слушатели читают эти поля на каждом событии — перезапуск не нужен
+        if self.welcome_worker and "first_message" in changed:
+            self.welcome_worker.greeting = changed["first_message"]
+        if self.autodeliver_worker:
+            if "account_name" in changed:
+                self.autodeliver_worker.account_name_filter = changed["account_name"]
+            if "mail" in changed:
+                self.autodeliver_worker.mail = changed["mail"]
+            if "password" in changed:
+                self.autodeliver_worker.password = changed["password"]
+        if "golden_key" in changed and (self.welcome_worker or self.autodeliver_worker):
+            self.console.append_line("Токен изменён — перезапустите слушатели / Token changed, restart listeners.")
 
     def _save_settings(self):
-        write_file(FILES["golden_key"], self.ed_token.text())
-        write_file(FILES["first_message"], self.ed_first_message.toPlainText())
-        write_file(FILES["account_name"], self.ed_account_name.text())
-        write_file(FILES["mail"], self.ed_mail.text())
-        write_file(FILES["password"], self.ed_password.text())
-        self.console.append_line("Настройки сохранены / Settings saved.")
+        saved = self.config.update(
+            golden_key=self.ed_token.text(),
+            first_message=self.ed_first_message.toPlainText(),
+            account_name=self.ed_account_name.text(),
+            mail=self.ed_mail.text(),
+            password=self.ed_password.text(),
+        )
+        if saved:
+            self.console.append_line("Настройки сохранены / Settings saved.")
+        else:
+            self.console.append_line("Настройки НЕ сохранены — причина выше / Settings NOT saved, see above.")
 
     def _save_notifications(self):
-        self.notifier.save(self.ed_webhook.text(), self.ed_tg_token.text(), self.ed_tg_chat.text())
-        self.console.append_line("Оповещения сохранены / Alerts saved.")
+        if self.notifier.save(self.ed_webhook.text(), self.ed_tg_token.text(), self.ed_tg_chat.text()):
+            self.console.append_line("Оповещения сохранены / Alerts saved.")
+        else:
+            self.console.append_line("Оповещения НЕ сохранены — причина выше / Alerts NOT saved, see above.")
 
     def _test_notifications(self):
         text = f"Test from {APP_NAME} at {datetime.now().isoformat(timespec='seconds')}"
@@ -557,6 +785,8 @@ class MainWindow(QtWidgets.QMainWindow):
                 raise RuntimeError("FunPayAPI not installed")
             acc = Account(token).get()
             lots = get_active_lots(acc, self.console.append_line)
+            self.analytics.set_lots(lots)
+            self._lot_titles = {str(l.lot_id): l.title for l in lots}
             if not lots:
                 self.console.append_line("Активные лоты не найдены.")
             rows = []
@@ -604,6 +834,72 @@ class MainWindow(QtWidgets.QMainWindow):
         except Exception as e:
             self.console.append_line(f"[export_json] {e}")
 
+    def _plan_lots(self):
+        token = self.ed_token.text().strip()
+        if not token:
+            self.console.append_line("Введите токен / Provide token.")
+            return
+        try:
+            if FunPayAPI is None:
+                raise RuntimeError("FunPayAPI not installed")
+            rules = load_rules(self.ed_rules_path.text().strip() or RULES_PATH)
+            if not rules:
+                self.console.append_line("Нет правил — создайте pricing_rules.json (схема в README).")
+                return
+            pools = load_pools(self.ed_json_path.text().strip() or FILES["autodelivery_json"])
+            acc = Account(token).get()
+            lots = get_active_lots(acc, self.console.append_line)
+            self._lot_plan = plan_changes(lots, rules, pools)
+            rows = []
+            for e in self._lot_plan:
+                price = f"{e.old_price} → {e.price}" if e.price is not None else e.old_price
+                stock = f"{e.old_stock} → {e.stock}" if e.stock is not None else e.old_stock
+                rows.append(["edit", e.lot_id, e.title, price, stock, ""])
+            self._set_rows(rows)
+            self.console.append_line(f"[lots] План: {len(self._lot_plan)} изм. из {len(lots)} лотов (dry-run, ничего не отправлено)")
+        except Exception as e:
+            self.console.append_line(f"[plan_lots] {e}")
+
+    def _apply_lots(self):
+        token = self.ed_token.text().strip()
+        if not self._lot_plan:
+            self.console.append_line("Сначала постройте план / Build a plan first.")
+            return
+        if self.lot_worker and self.lot_worker.isRunning():
+            self.console.append_line("[lots] Применение уже идёт.")
+            return
+        self.lot_worker = LotUpdateWorker(token, self._lot_plan)
+        self.lot_worker.message.connect(self.console.append_line)
+        self.lot_worker.start()
+        self._lot_plan = []
+
+    # ---------- Analytics ----------
+    def _refresh_analytics(self):
+        if self.tabs.currentWidget() is not self.tab_analytics:
+            return
+        snap = self.analytics.snapshot()
+        rate = snap["delivery_success_rate"]
+        rate_text = f"{rate * 100:.1f}%" if rate is not None else "—"
+
+        def secs(v):
+            return f"{v:.0f} с" if v is not None else "—"
+
+        self.lbl_analytics.setText(
+            f"За 24 ч: заказов {snap['orders']}, выручка {snap['revenue']:.2f} ₽ | "
+            f"выдано {snap['delivered']}, ошибок {snap['failed']}, успех {rate_text} | "
+            f"время до выдачи p50 {secs(snap['ttd_p50'])}, p90 {secs(snap['ttd_p90'])}, p99 {secs(snap['ttd_p99'])}")
+        self.chart_orders.set_items(
+            (datetime.fromtimestamp(ts).strftime("%H:00"), n) for ts, n in snap["orders_per_hour"])
+        self.chart_subcategory.set_items(
+            sorted(snap["revenue_by_subcategory"].items(), key=lambda kv: kv[1], reverse=True)[:12])
+
+        by_lot = sorted(snap["revenue_by_lot"].items(), key=lambda kv: kv[1], reverse=True)
+        self.table_revenue.setRowCount(len(by_lot))
+        for row, (key, revenue) in enumerate(by_lot):
+            self.table_revenue.setItem(row, 0, QtWidgets.QTableWidgetItem(key))
+            self.table_revenue.setItem(row, 1, QtWidgets.QTableWidgetItem(self._lot_titles.get(key, "")))
+            self.table_revenue.setItem(row, 2, QtWidgets.QTableWidgetItem(f"{revenue:.2f}"))
+
     # ---------- Listeners control ----------
     def _start_welcome(self):
         token = self.ed_token.text().strip()
@@ -612,7 +908,7 @@ class MainWindow(QtWidgets.QMainWindow):
             self.console.append_line("Введите токен и приветствие / Provide token and greeting.")
             return
         self._stop_welcome()
-        self.welcome_worker = FunPayWelcomeWorker(token, greeting, self.notifier)
+        self.welcome_worker = FunPayWelcomeWorker(token, greeting, self.notifier, self.plugins, self._journal_if_enabled())
         self.welcome_worker.message.connect(self.console.append_line)
         self.welcome_worker.event_info.connect(self.console.append_line)
         self.welcome_worker.start()
@@ -626,7 +922,8 @@ class MainWindow(QtWidgets.QMainWindow):
             self.console.append_line("Введите токен, почту и пароль / Provide token, mail, password.")
             return
         self._stop_auto()
-        self.autodeliver_worker = FunPayAutoDeliverWorker(token, name_filter, mail, pwd, self.notifier)
+        self.autodeliver_worker = FunPayAutoDeliverWorker(token, name_filter, mail, pwd, self.notifier, self.plugins,
+                                                          self._journal_if_enabled(), self.analytics)
         self.autodeliver_worker.message.connect(self.console.append_line)
         self.autodeliver_worker.event_info.connect(self.console.append_line)
         self.autodeliver_worker.start()
@@ -646,35 +943,69 @@ class MainWindow(QtWidgets.QMainWindow):
     def _stop_all(self):
         self._stop_welcome()
         self._stop_auto()
-        self._stop_external_script()
+        if self.lot_worker:
+            self.lot_worker.stop()
+            self.lot_worker.wait(1000)
+            self.lot_worker = None
         self.console.append_line("Все процессы остановлены / All processes stopped.")
 
-    # ---------- External script ----------
-    def _choose_script(self):
+    # ---------- Plugins ----------
+    def _choose_plugin(self):
         path, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Выберите .py", os.getcwd(), "Python (*.py)")
         if path:
-            self.script_path_edit.setText(path)
+            self.plugin_path_edit.setText(path)
 
-    def _run_external_script(self):
-        path = self.script_path_edit.text().strip()
-        debug = self.chk_debug_output.isChecked()
+    def _load_plugin(self):
+        path = self.plugin_path_edit.text().strip()
         if not path:
-            self.console.append_line("Укажите путь к скрипту / Choose a script path.")
+            self.console.append_line("Укажите путь к плагину / Choose a plugin path.")
             return
-        self._stop_external_script()
-        self.ext_runner = ExternalScriptRunner(path, debug)
-        self.ext_runner.message.connect(self.console.append_line)
-        self.ext_runner.start()
+        if self.plugins.load(path):
+            names = ", ".join(self.plugins.plugins)
+            self.lbl_plugins.setText(f"Загружены: {names}")
+            if not (self.welcome_worker or self.autodeliver_worker):
+                self.console.append_line("Плагин получит события после запуска слушателя / Start a listener.")
+
+    def _unload_plugins(self):
+        self.plugins.unload_all()
+        self.lbl_plugins.setText("Плагины выгружены.")
+        self.console.append_line("Плагины выгружены / Plugins unloaded.")
+
+    # ---------- Journal ----------
+    def _journal_if_enabled(self) -> EventJournal | None:
+        return self.journal if self.chk_journal.isChecked() else None
+
+    def _choose_journal(self):
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Сегмент журнала", JOURNAL_DIR, "Journal (*.jsonl.gz)")
+        if path:
+            self.replay_path_edit.setText(path)
 
-    def _stop_external_script(self):
-        if self.ext_runner:
-            self.ext_runner.stop()
-            self.ext_runner.wait(500)
-            self.ext_runner = None
+    def _start_replay(self):
+        path = self.replay_path_edit.text().strip() or JOURNAL_DIR
+        if not os.path.exists(path):
+            self.console.append_line(f"Журнал не найден / Journal not found: {path}")
+            return
+        self._stop_replay()
+        self.replay_worker = JournalReplayWorker(
+            path, self.spin_replay_speed.value(),
+            self.ed_first_message.toPlainText().strip(), self.ed_account_name.text().strip(),
+            self.ed_mail.text().strip(), self.ed_password.text().strip())
+        self.replay_worker.message.connect(self.console.append_line)
+        self.replay_worker.start()
+
+    def _stop_replay(self):
+        if self.replay_worker:
+            self.replay_worker.stop()
+            self.replay_worker.wait(1000)
+            self.replay_worker = None
 
     # ---------- Close ----------
     def closeEvent(self, e: QtGui.QCloseEvent) -> None:
         self._stop_all()
+        self._stop_replay()
+        self.journal.close()
+        self.plugins.shutdown()
+        self.config.stop_watching()
         return super().closeEvent(e)
 
 # ---------------------------- Main ----------------------------
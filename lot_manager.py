@@ -0,0 +1,219 @@
+# lot_manager.py
+"""
+Автоуправление ценой и остатком лотов по правилам из pricing_rules.json.
+
+Схема правил:
+[
+  {"subcategory": "Roblox > Robux", "min_price": 50, "max_price": 120,
+   "stock_from_pool": true, "max_stock": 20},
+  {"lot_id": 123456, "schedule": [{"at": "09:00", "price": 59}, {"at": "21:00", "price": 69}]}
+]
+Правило по lot_id важнее правила по подкатегории. Размер пула выдачи —
+длина списка "delivery_pool" у лота в autodelivery_items.json; автовыдача
+снимает товары с начала этого списка (take_pool_item).
+
+plan_changes() ничего не отправляет — это dry-run; apply_changes() шлёт
+только отличающиеся поля, пачками с паузой между ними.
+"""
+from __future__ import annotations
+import json, os, tempfile, threading, time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+RULES_PATH = "pricing_rules.json"
+
+_pool_lock = threading.Lock()
+
+
+class Rule:
+    def __init__(self, data: dict):
+        self.lot_id = data.get("lot_id")
+        self.subcategory = data.get("subcategory")
+        self.min_price = data.get("min_price")
+        self.max_price = data.get("max_price")
+        self.stock = data.get("stock")
+        self.stock_from_pool = bool(data.get("stock_from_pool", False))
+        self.max_stock = data.get("max_stock")
+        # [(минуты от полуночи, цена)] по возрастанию времени
+        self.schedule = sorted((_minutes(it["at"]), float(it["price"])) for it in data.get("schedule", []))
+
+    def scheduled_price(self, now: datetime) -> Optional[float]:
+        if not self.schedule:
+            return None
+        minute = now.hour * 60 + now.minute
+        price = self.schedule[-1][1]  # до первой отметки действует последняя вчерашняя
+        for at, p in self.schedule:
+            if at <= minute:
+                price = p
+        return price
+
+
+class LotEdit:
+    def __init__(self, lot, price: Optional[float] = None, stock: Optional[int] = None):
+        self.lot_id = lot.lot_id
+        self.title = lot.title
+        self.old_price = lot.price
+        self.old_stock = lot.stock
+        self.price = price
+        self.stock = stock
+
+    def describe(self) -> str:
+        parts = []
+        if self.price is not None:
+            parts.append(f"цена {self.old_price} → {self.price}")
+        if self.stock is not None:
+            parts.append(f"остаток {self.old_stock} → {self.stock}")
+        return f"{self.lot_id} {self.title}: " + ", ".join(parts)
+
+
+def _minutes(hhmm: str) -> int:
+    h, m = hhmm.split(":")
+    return int(h) * 60 + int(m)
+
+
+def load_rules(path: str = RULES_PATH) -> List[Rule]:
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return [Rule(it) for it in json.load(f)]
+
+
+def load_pools(path: str) -> Dict[int, int]:
+    """lot_id -> сколько товаров осталось в пуле выдачи."""
+    pools = {}
+    if not os.path.exists(path):
+        return pools
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    for it in data:
+        if it.get("lot_id") is not None and isinstance(it.get("delivery_pool"), list):
+            pools[int(it["lot_id"])] = len(it["delivery_pool"])
+    return pools
+
+
+def _write_json(path: str, data):
+    """Атомарная запись: временный файл рядом + os.replace."""
+    fd, tmp = tempfile.mkstemp(prefix=".pool-", suffix=".tmp", dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def take_pool_item(path: str, match: Callable[[dict], bool]) -> Tuple[Optional[dict], Optional[str]]:
+    """
+    Первая запись, для которой match() истинно, и снятый с начала её delivery_pool товар.
+    Файл перезаписывается до отправки, так что один товар не уйдёт двум покупателям.
+    :return: (запись, товар); товар None, если пула нет или он пуст; (None, None) — записи нет
+    """
+    with _pool_lock:
+        if not os.path.exists(path):
+            return None, None
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        for it in data:
+            if not match(it):
+                continue
+            pool = it.get("delivery_pool")
+            if not isinstance(pool, list) or not pool:
+                return it, None
+            item = pool.pop(0)
+            _write_json(path, data)
+            return it, item
+        return None, None
+
+
+def return_pool_item(path: str, match: Callable[[dict], bool], item: str) -> bool:
+    """Возвращает товар в начало пула, если выдать его не удалось."""
+    with _pool_lock:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        for it in data:
+            if match(it) and isinstance(it.get("delivery_pool"), list):
+                it["delivery_pool"].insert(0, item)
+                _write_json(path, data)
+                return True
+        return False
+
+
+def _rule_for(lot, rules: List[Rule]) -> Optional[Rule]:
+    by_subcategory = None
+    for r in rules:
+        if r.lot_id is not None and lot.lot_id is not None and int(r.lot_id) == int(lot.lot_id):
+            return r
+        if by_subcategory is None and r.subcategory and r.subcategory == lot.subcategory:
+            by_subcategory = r
+    return by_subcategory
+
+
+def plan_changes(lots, rules: List[Rule], pools: Dict[int, int], now: datetime | None = None) -> List[LotEdit]:
+    """Минимальный набор правок: лоты без изменений в план не попадают."""
+    now = now or datetime.now()
+    edits = []
+    for lot in lots:
+        rule = _rule_for(lot, rules)
+        if rule is None:
+            continue
+
+        price = rule.scheduled_price(now)
+        if price is None:
+            price = lot.price
+        if price is not None:
+            price = round(float(price), 2)
+            if rule.min_price is not None:
+                price = max(price, float(rule.min_price))
+            if rule.max_price is not None:
+                price = min(price, float(rule.max_price))
+
+        stock = rule.stock
+        if rule.stock_from_pool and lot.lot_id is not None and int(lot.lot_id) in pools:
+            stock = pools[int(lot.lot_id)]
+        if stock is not None and rule.max_stock is not None:
+            stock = min(int(stock), int(rule.max_stock))
+
+        new_price = price if price is not None and price != lot.price else None
+        new_stock = int(stock) if stock is not None and stock != lot.stock else None
+        if new_price is not None or new_stock is not None:
+            edits.append(LotEdit(lot, new_price, new_stock))
+    return edits
+
+
+def apply_changes(acc, edits: List[LotEdit], log, batch_size: int = 5, delay: float = 3.0,
+                  stop_event=None, sleep=time.sleep) -> int:
+    """
+    Применяет правки через acc.get_lot_fields()/acc.save_lot().
+    :return: сколько лотов сохранено
+    """
+    if not (hasattr(acc, "get_lot_fields") and hasattr(acc, "save_lot")):
+        log("[lots] Версия FunPayAPI не поддерживает редактирование лотов (нет get_lot_fields/save_lot)")
+        return 0
+    saved = 0
+    for i, edit in enumerate(edits):
+        if stop_event is not None and stop_event.is_set():
+            break
+        if i and i % batch_size == 0:
+            if stop_event is not None:
+                # Стоп срабатывает и во время паузы между пачками
+                if stop_event.wait(delay):
+                    break
+            else:
+                sleep(delay)
+        try:
+            fields = acc.get_lot_fields(edit.lot_id)
+            if edit.price is not None:
+                fields.price = edit.price
+            if edit.stock is not None:
+                fields.amount = edit.stock
+            acc.save_lot(fields)
+            saved += 1
+            log(f"[lots] {edit.describe()}")
+        except Exception as e:
+            log(f"[lots] Ошибка сохранения {edit.lot_id}: {e}")
+    log(f"[lots] Сохранено лотов: {saved}/{len(edits)}")
+    return saved
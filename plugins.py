@@ -0,0 +1,261 @@
+# plugins.py
+"""
+Плагины: .py-файлы, которые регистрируют обработчики событий FunPay
+и получают события от уже запущенных слушателей приложения.
+
+Пример плагина:
+
+    def setup(api):
+        @api.on("NEW_MESSAGE")
+        def on_message(event):
+            api.log(f"сообщение в чате {event.message.chat_id}")
+            api.send(event.message.chat_id, "Привет!")
+
+Имена типов событий совпадают с именами FunPayAPI.enums.EventTypes.
+Обработчики выполняются в общем пуле потоков с таймаутом, аккаунт и
+очередь отправки общие для всех плагинов — отдельный вход и polling не нужны.
+"""
+from __future__ import annotations
+import os, queue, threading, time, importlib.util
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple
+
+
+class SendQueue:
+    """
+    Последовательная отправка сообщений через общий Account в отдельном потоке.
+    """
+    def __init__(self, log):
+        self.log = log
+        self.acc = None
+        self._q: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, name="send-queue", daemon=True)
+        self._thread.start()
+
+    def put(self, chat_id, text: str):
+        self._q.put((chat_id, text))
+
+    def _loop(self):
+        while True:
+            chat_id, text = self._q.get()
+            if self.acc is None:
+                self.log(f"[plugins] Нет аккаунта — сообщение в чат {chat_id} отброшено.")
+                continue
+            try:
+                self.acc.send_message(chat_id, text)
+            except Exception as e:
+                self.log(f"[plugins] send error: {e}")
+
+
+class PluginAPI:
+    """
+    Объект, который получает функция setup(api) плагина.
+    """
+    def __init__(self, name: str, manager: "PluginManager"):
+        self.name = name
+        self._manager = manager
+        self.handlers: Dict[str, List[Callable]] = {}
+
+    @property
+    def account(self):
+        return self._manager.acc
+
+    def on(self, event_type: str):
+        def deco(fn):
+            self.handlers.setdefault(event_type.upper(), []).append(fn)
+            return fn
+        return deco
+
+    def send(self, chat_id, text: str):
+        self._manager.send_queue.put(chat_id, text)
+
+    def log(self, msg: str):
+        self._manager.log(f"[{self.name}] {msg}")
+
+
+class _HandlerState:
+    """Очередь одного обработчика: в пуле у него не больше одного вызова одновременно."""
+    def __init__(self, plugin: str, fn: Callable):
+        self.plugin = plugin
+        self.fn = fn
+        self.queue: deque = deque()
+        self.running = False
+        self.deadline: float | None = None
+        self.hung = False
+        self.overflow = False
+
+
+class PluginManager:
+    """
+    Загружает плагины и раздаёт им события слушателей.
+    Если запущены оба слушателя, одно и то же событие доставляется плагинам один раз.
+    """
+    def __init__(self, log, max_workers: int = 4, timeout: float = 10.0, queue_limit: int = 100,
+                 dedup_window: float = 2.0):
+        self.log = log
+        self.timeout = timeout
+        self.queue_limit = queue_limit
+        self.dedup_window = dedup_window
+        self.acc = None
+        self.plugins: Dict[str, PluginAPI] = {}
+        self.send_queue = SendQueue(log)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="plugin")
+        self._lock = threading.Lock()
+        self._seen = deque(maxlen=512)
+        self._anon_seen: Dict[str, float] = {}  # тип события без id -> когда видели
+        self._handlers: Dict[Tuple, _HandlerState] = {}
+        self._watchdog_stop = threading.Event()
+        self._watchdog = threading.Thread(target=self._watch, name="plugin-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def attach(self, acc):
+        """Вызывается слушателем после входа: плагины используют его Account."""
+        self.acc = acc
+        self.send_queue.acc = acc
+
+    def load(self, path: str) -> bool:
+        if not os.path.exists(path):
+            self.log(f"[plugins] Файл не найден: {path}")
+            return False
+        name = os.path.splitext(os.path.basename(path))[0]
+        try:
+            spec = importlib.util.spec_from_file_location(f"funpay_plugin_{name}", path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            if not hasattr(module, "setup"):
+                self.log(f"[plugins] В {name} нет функции setup(api)")
+                return False
+            api = PluginAPI(name, self)
+            module.setup(api)
+        except Exception as e:
+            self.log(f"[plugins] Ошибка загрузки {name}: {e}")
+            return False
+        with self._lock:
+            self.plugins[name] = api
+        types = ", ".join(sorted(api.handlers)) or "—"
+        self.log(f"[plugins] Загружен {name} (события: {types})")
+        return True
+
+    def unload(self, name: str):
+        with self._lock:
+            self.plugins.pop(name, None)
+            for st in self._handlers.values():
+                if st.plugin == name:
+                    st.queue.clear()
+
+    def unload_all(self):
+        with self._lock:
+            self.plugins.clear()
+            for st in self._handlers.values():
+                st.queue.clear()
+
+    def _event_key(self, event):
+        """
+        Ключ для отсева дубля от второго слушателя. Статус заказа входит в ключ —
+        ORDER_STATUS_CHANGED по одному заказу приходит несколько раз (оплачен → закрыт → возврат).
+        """
+        type_name = self._type_name(event)
+        order = getattr(event, "order", None)
+        if order is not None and getattr(order, "id", None) is not None:
+            status = getattr(order, "status", None)
+            return (type_name, order.id, getattr(status, "name", status))
+        message = getattr(event, "message", None)
+        if message is not None and getattr(message, "id", None) is not None:
+            return (type_name, message.id)
+        chat = getattr(event, "chat", None)
+        if chat is not None and getattr(chat, "id", None) is not None:
+            return (type_name, chat.id, getattr(chat, "last_message_text", None))
+        return None
+
+    @staticmethod
+    def _type_name(event) -> str:
+        t = getattr(event, "type", None)
+        return getattr(t, "name", str(t)).upper()
+
+    def _is_duplicate(self, event) -> bool:
+        key = self._event_key(event)
+        if key is None:
+            # у CHATS_LIST_CHANGED и подобных нет id: дубль — тот же тип в пределах dedup_window
+            type_name = self._type_name(event)
+            now = time.monotonic()
+            last = self._anon_seen.get(type_name)
+            self._anon_seen[type_name] = now
+            return last is not None and now - last < self.dedup_window
+        if key in self._seen:
+            return True
+        self._seen.append(key)
+        return False
+
+    def dispatch(self, event):
+        """
+        Ставит событие в очереди обработчиков и сразу возвращается — слушатель не ждёт плагины.
+        У каждого обработчика не больше одного вызова в пуле, так что медленный плагин
+        не занимает все потоки. Таймаут отслеживает отдельный поток: зависший обработчик
+        (потоки нельзя убить) логируется и пропускает новые события, пока не завершится.
+        """
+        to_start, overflowed = [], []
+        with self._lock:
+            if not self.plugins or self._is_duplicate(event):
+                return
+            type_name = self._type_name(event)
+            for api in self.plugins.values():
+                for fn in api.handlers.get(type_name, []):
+                    st = self._handlers.setdefault((api.name, id(fn)), _HandlerState(api.name, fn))
+                    if st.hung:
+                        continue
+                    if len(st.queue) >= self.queue_limit:
+                        if not st.overflow:
+                            st.overflow = True
+                            overflowed.append(st)
+                        continue
+                    st.queue.append(event)
+                    if not st.running:
+                        st.running = True
+                        to_start.append(st)
+        for st in overflowed:
+            self.log(f"[{st.plugin}] {st.fn.__name__}: очередь переполнена ({self.queue_limit}), события пропускаются")
+        for st in to_start:
+            self._pool.submit(self._run_next, st)
+
+    def _run_next(self, st: _HandlerState):
+        with self._lock:
+            if not st.queue:
+                st.running = False
+                return
+            event = st.queue.popleft()
+            # таймаут считается с начала выполнения, а не с постановки в очередь
+            st.deadline = time.monotonic() + self.timeout
+        try:
+            st.fn(event)
+        except Exception as e:
+            self.log(f"[{st.plugin}] {st.fn.__name__}: {e}")
+        with self._lock:
+            st.deadline = None
+            recovered, st.hung = st.hung, False
+            st.overflow = False
+            more = bool(st.queue)
+            st.running = more
+        if recovered:
+            self.log(f"[{st.plugin}] {st.fn.__name__}: завершился, снова получает события")
+        if more:
+            # следующее событие — в конец очереди пула, чтобы другие плагины не ждали
+            self._pool.submit(self._run_next, st)
+
+    def _watch(self):
+        while not self._watchdog_stop.wait(0.5):
+            now = time.monotonic()
+            overdue = []
+            with self._lock:
+                for st in self._handlers.values():
+                    if not st.hung and st.deadline is not None and now > st.deadline:
+                        st.hung = True
+                        st.queue.clear()
+                        overdue.append(st)
+            for st in overdue:
+                self.log(f"[{st.plugin}] {st.fn.__name__}: таймаут {self.timeout:g} с — новые события пропускаются")
+
+    def shutdown(self):
+        self.unload_all()
+        self._watchdog_stop.set()
+        self._pool.shutdown(wait=False)
@@ -1,6 +1,6 @@
 # store_fetcher.py
 from typing import List
-import json
+import json, os
 
 class Lot:
     def __init__(self, data: dict):
@@ -46,12 +46,14 @@ def get_active_lots(acc, log) -> List[dict]:
 
         raw_lots = profile.get_lots()
         for lot in raw_lots:
+            # LotShortcut: остаток в amount, подкатегория — объект SubCategory
+            subcategory = getattr(lot, "subcategory", None)
             data = {
                 "lot_id": getattr(lot, "id", None),
                 "title": getattr(lot, "title", ""),
                 "price": getattr(lot, "price", 0.0),
-                "stock": getattr(lot, "stock", 0),
-                "subcategory": getattr(lot, "subcategory_name", ""),
+                "stock": getattr(lot, "amount", getattr(lot, "stock", None)),
+                "subcategory": getattr(subcategory, "name", None) or getattr(lot, "subcategory_name", ""),
                 "delivery_text": ""
             }
             lots.append(Lot(data))
@@ -70,9 +72,20 @@ def export_autodelivery_json(lots: list, path="autodelivery_items.json", deliver
     :param lots: список словарей
     :param path: путь сохранения
     :param delivery_template: строка, шаблон для поля delivery_text (по умолчанию пусто)
+    Пулы выдачи (delivery_pool) уже выгруженных лотов сохраняются.
     """
+    pools = {}
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                pools = {it.get("lot_id"): it["delivery_pool"] for it in json.load(f)
+                         if it.get("lot_id") is not None and isinstance(it.get("delivery_pool"), list)}
+        except (OSError, ValueError, AttributeError):
+            pools = {}
     for lot in lots:
         if delivery_template:
             lot["delivery_text"] = delivery_template
+        if lot.get("lot_id") in pools and "delivery_pool" not in lot:
+            lot["delivery_pool"] = pools[lot["lot_id"]]
     with open(path, "w", encoding="utf-8") as f:
         json.dump(lots, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,114 @@
+# test_config_store.py
+import json
+import os
+
+import pytest
+
+import config_store
+from config_store import ConfigStore, KEY_ENV
+
+pytest.importorskip("cryptography")
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv(KEY_ENV, raising=False)
+    return tmp_path
+
+
+def stored_values():
+    with open(config_store.CONFIG_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)["values"]
+
+
+def touch(path, bump):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + bump))
+
+
+def test_legacy_files_are_migrated_and_deleted():
+    with open("goldenkey.txt", "w", encoding="utf-8") as f:
+        f.write("token-123\n")
+    with open("message.txt", "w", encoding="utf-8") as f:
+        f.write("Привет")
+    logs = []
+    store = ConfigStore(logs.append)
+    assert store["golden_key"] == "token-123"
+    assert store["first_message"] == "Привет"
+    assert not os.path.exists("goldenkey.txt")
+    assert not os.path.exists("message.txt")
+    assert stored_values()["golden_key"].startswith("enc:")
+    assert any("Удалены старые файлы" in line for line in logs)
+
+
+def test_lost_key_keeps_secrets_and_refuses_to_save():
+    ConfigStore(lambda msg: None).update(golden_key="token", password="secret")
+    before = stored_values()
+    os.remove(config_store.KEY_PATH)
+
+    store = ConfigStore(lambda msg: None)
+    assert store["golden_key"] == ""
+    assert not os.path.exists(config_store.KEY_PATH)
+    assert store.update(tg_chat_id="42") is False
+    assert store["tg_chat_id"] == ""
+    assert stored_values() == before
+
+
+def test_wrong_key_recovers_when_key_is_restored():
+    from cryptography.fernet import Fernet
+
+    ConfigStore(lambda msg: None).update(golden_key="token", tg_bot_token="bot")
+    with open(config_store.KEY_PATH, "rb") as f:
+        good_key = f.read()
+    with open(config_store.KEY_PATH, "wb") as f:
+        f.write(Fernet.generate_key())
+
+    logs = []
+    store = ConfigStore(logs.append)
+    assert store["golden_key"] == ""
+    assert store.check_external_change() == {}
+    assert store.check_external_change() == {}
+    assert len([line for line in logs if "не расшифрованы" in line]) == 1
+
+    changes = []
+    store.subscribe(changes.append)
+    with open(config_store.KEY_PATH, "wb") as f:
+        f.write(good_key)
+    touch(config_store.KEY_PATH, 1000)
+    assert store.check_external_change() == {"golden_key": "token", "tg_bot_token": "bot"}
+    assert changes == [{"golden_key": "token", "tg_bot_token": "bot"}]
+    assert store.update(tg_chat_id="42") is True
+
+
+def test_replacing_every_undecrypted_secret_allows_saving():
+    ConfigStore(lambda msg: None).update(golden_key="token")
+    os.remove(config_store.KEY_PATH)
+    store = ConfigStore(lambda msg: None)
+    assert store.update(golden_key="new-token") is True
+    assert ConfigStore(lambda msg: None)["golden_key"] == "new-token"
+
+
+def test_external_change_notifies_subscribers():
+    store = ConfigStore(lambda msg: None)
+    store.update(first_message="hi")
+    changes = []
+    store.subscribe(changes.append)
+
+    data = {"version": 1, "values": dict(stored_values(), first_message="hello", mail="a@b")}
+    with open(config_store.CONFIG_PATH, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    touch(config_store.CONFIG_PATH, 1000)
+
+    assert store.check_external_change() == {"first_message": "hello", "mail": "a@b"}
+    assert changes == [{"first_message": "hello", "mail": "a@b"}]
+    assert store["mail"] == "a@b"
+
+
+def test_bad_env_key_reports_real_cause(monkeypatch):
+    ConfigStore(lambda msg: None).update(golden_key="token")
+    monkeypatch.setenv(KEY_ENV, "not-a-key")
+    logs = []
+    ConfigStore(logs.append)
+    assert any(KEY_ENV in line and "неверный ключ" in line for line in logs)
+    assert not any("cryptography не установлен" in line for line in logs)
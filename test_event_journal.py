@@ -0,0 +1,25 @@
+# test_event_journal.py
+from types import SimpleNamespace
+
+from event_journal import HIDDEN, EventJournal, read_journal
+
+
+def message_event(author_id, text):
+    return SimpleNamespace(type=SimpleNamespace(name="NEW_MESSAGE"),
+                           message=SimpleNamespace(chat_id=7, author_id=author_id, text=text, html=text))
+
+
+def test_own_messages_and_chat_previews_are_hidden(tmp_path):
+    journal = EventJournal(lambda msg: None, folder=str(tmp_path))
+    journal.record_session("welcome", SimpleNamespace(id=1))
+    journal.record_event("welcome", message_event(1, "Почта: a@b\nПароль: secret"))
+    journal.record_event("welcome", message_event(2, "привет"))
+    journal.record_event("welcome", SimpleNamespace(type=SimpleNamespace(name="LAST_CHAT_MESSAGE_CHANGED"),
+                                                    chat=SimpleNamespace(id=7, last_message_text="Пароль: secret")))
+    journal.close()
+
+    events = [r["data"] for r in read_journal(str(tmp_path)) if r["kind"] == "event"]
+    assert events[0]["message"] == {"chat_id": 7, "author_id": 1, "text": HIDDEN, "html": HIDDEN}
+    assert events[1]["message"]["text"] == "привет"
+    assert events[2]["chat"] == {"id": 7, "last_message_text": HIDDEN}
+    assert "secret" not in str(list(read_journal(str(tmp_path))))
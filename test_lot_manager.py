@@ -0,0 +1,104 @@
+# test_lot_manager.py
+import json
+import threading
+from datetime import datetime
+
+from lot_manager import Rule, apply_changes, load_pools, plan_changes, return_pool_item, take_pool_item
+from store_fetcher import Lot, export_autodelivery_json
+
+
+class FakeFields:
+    def __init__(self, lot_id):
+        self.lot_id = lot_id
+
+
+class FakeAccount:
+    def __init__(self):
+        self.saved = []
+
+    def get_lot_fields(self, lot_id):
+        return FakeFields(lot_id)
+
+    def save_lot(self, fields):
+        self.saved.append(fields)
+
+
+def lot(lot_id, price, stock, subcategory="Roblox > Robux"):
+    return Lot({"lot_id": lot_id, "title": f"lot {lot_id}", "price": price, "stock": stock,
+                "subcategory": subcategory})
+
+
+def test_unchanged_lots_are_skipped():
+    rules = [Rule({"subcategory": "Roblox > Robux", "min_price": 50, "max_price": 100,
+                   "stock_from_pool": True})]
+    lots = [lot(1, 60.0, 3), lot(2, 70.0, 5, subcategory="Other")]
+    assert plan_changes(lots, rules, {1: 3}) == []
+
+
+def test_price_is_clamped_to_floor_and_ceiling():
+    rules = [Rule({"subcategory": "Roblox > Robux", "min_price": 50, "max_price": 100})]
+    edits = plan_changes([lot(1, 10.0, 1), lot(2, 500.0, 1), lot(3, 75.0, 1)], rules, {})
+    assert [(e.lot_id, e.price, e.stock) for e in edits] == [(1, 50.0, None), (2, 100.0, None)]
+
+
+def test_schedule_and_pool_stock():
+    rules = [Rule({"lot_id": 1, "schedule": [{"at": "09:00", "price": 59}, {"at": "21:00", "price": 69}],
+                   "stock_from_pool": True, "max_stock": 4})]
+    edits = plan_changes([lot(1, 59.0, 2)], rules, {1: 10}, now=datetime(2026, 1, 1, 22, 0))
+    assert [(e.price, e.stock) for e in edits] == [(69.0, 4)]
+
+
+def test_apply_sleeps_between_batches():
+    acc = FakeAccount()
+    rules = [Rule({"subcategory": "Roblox > Robux", "min_price": 50})]
+    edits = plan_changes([lot(i, 1.0, 1) for i in range(1, 6)], rules, {})
+    sleeps = []
+    saved = apply_changes(acc, edits, lambda msg: None, batch_size=2, delay=3.0, sleep=sleeps.append)
+    assert saved == 5
+    assert [f.price for f in acc.saved] == [50.0] * 5
+    assert sleeps == [3.0, 3.0]
+
+
+def test_apply_stops_during_pause():
+    class StopOnWait(threading.Event):
+        def wait(self, timeout=None):
+            self.set()
+            return True
+
+    acc = FakeAccount()
+    rules = [Rule({"subcategory": "Roblox > Robux", "min_price": 50})]
+    edits = plan_changes([lot(i, 1.0, 1) for i in range(1, 6)], rules, {})
+    saved = apply_changes(acc, edits, lambda msg: None, batch_size=2, stop_event=StopOnWait())
+    assert saved == 2
+
+
+def test_pool_items_are_taken_and_returned(tmp_path):
+    path = str(tmp_path / "autodelivery_items.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump([{"lot_id": 1, "title": "A", "delivery_pool": ["k1", "k2"]},
+                   {"lot_id": 2, "title": "B"}], f)
+
+    def is_a(it):
+        return it.get("title") == "A"
+
+    entry, item = take_pool_item(path, is_a)
+    assert (entry["lot_id"], item) == (1, "k1")
+    assert load_pools(path) == {1: 1}
+    assert take_pool_item(path, lambda it: it.get("title") == "B")[1] is None
+    assert take_pool_item(path, lambda it: False) == (None, None)
+
+    assert return_pool_item(path, is_a, item)
+    assert load_pools(path) == {1: 2}
+    assert take_pool_item(path, is_a)[1] == "k1"
+
+
+def test_export_keeps_existing_pools(tmp_path):
+    path = str(tmp_path / "autodelivery_items.json")
+    export_autodelivery_json([{"lot_id": 1, "title": "A"}], path)
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    data[0]["delivery_pool"] = ["k1"]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    export_autodelivery_json([{"lot_id": 1, "title": "A (new)"}, {"lot_id": 2, "title": "B"}], path)
+    assert load_pools(path) == {1: 1}